@@ -5,9 +5,14 @@ WiFi Auto Auth Dashboard - Web-based monitoring interface for WiFi login attempt
 import sqlite3
 import json
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional
-from fastapi import FastAPI, Request, Depends, HTTPException, status, Form
+from fastapi import FastAPI, Request, Depends, HTTPException, status, Form, Query
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse, RedirectResponse
@@ -70,13 +75,13 @@ DASHBOARD_CONFIG = load_dashboard_config()
 # --- PYDANTIC MODELS ---
 class LoginAttempt(BaseModel):
     id: int
-    timestamp: str
+    timestamp: Optional[str] = None
     network_name: Optional[str] = None
     network_ssid: Optional[str] = None
-    username: str
-    a: str
-    response_status: str
-    response_message: str
+    username: Optional[str] = None
+    a: Optional[str] = None
+    response_status: Optional[str] = None
+    response_message: Optional[str] = None
 
 class DashboardStats(BaseModel):
     total_attempts: int
@@ -85,12 +90,33 @@ class DashboardStats(BaseModel):
     success_rate: float
     last_attempt: Optional[str]
 
-class FilterParams(BaseModel):
-    start_date: Optional[str] = None
-    end_date: Optional[str] = None
-    status_filter: Optional[str] = None
-    network_filter: Optional[str] = None
-    limit: int = 50
+class NetworkStats(BaseModel):
+    network_name: Optional[str]
+    network_ssid: Optional[str]
+    total_attempts: int
+    successful_attempts: int
+    failed_attempts: int
+    success_rate: float
+    last_attempt: Optional[str]
+
+class HourlyStats(BaseModel):
+    hour: Optional[str]
+    total_attempts: int
+    successful_attempts: int
+    failed_attempts: int
+
+# Declared response models let FastAPI serialize straight to JSON via Pydantic
+class AttemptsResponse(BaseModel):
+    attempts: List[LoginAttempt]
+
+class StatsResponse(BaseModel):
+    stats: DashboardStats
+
+class NetworkStatsResponse(BaseModel):
+    network_stats: List[NetworkStats]
+
+class HourlyStatsResponse(BaseModel):
+    hourly_stats: List[HourlyStats]
 
 # --- FASTAPI APP SETUP ---
 app = FastAPI(title="WiFi Auto Auth Dashboard", version="1.0.0")
@@ -102,7 +128,19 @@ templates = Jinja2Templates(directory="templates")
 static_dir = Path("static")
 static_dir.mkdir(exist_ok=True)
 
-app.mount("/static", StaticFiles(directory="static"), name="static")
+# Let browsers reuse dashboard assets instead of re-requesting them on every page load
+STATIC_CACHE_CONTROL = "public, max-age=86400"
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that adds Cache-Control headers to asset responses"""
+    
+    def file_response(self, *args, **kwargs):
+        """Build the file (or 304) response and attach the cache header"""
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = STATIC_CACHE_CONTROL
+        return response
+
+app.mount("/static", CachedStaticFiles(directory="static"), name="static")
 
 # Simple authentication
 security = HTTPBasic()
@@ -120,15 +158,110 @@ def authenticate(credentials: HTTPBasicCredentials = Depends(security)):
         )
     return credentials.username
 
+# Upper bounds for API query parameters
+MAX_ATTEMPTS_LIMIT = 1000
+MAX_HOURLY_DAYS = 90
+MAX_FILTER_LENGTH = 64
+
 # --- DATABASE FUNCTIONS ---
-def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_NAME)
+DB_POOL_SIZE = 4
+
+# --- SQL ---
+# Every query is a fixed string so SQLite's per-connection statement cache can
+# reuse the compiled program instead of re-parsing and re-planning it.
+SQL_ATTEMPTS_BASE = """
+    SELECT id, timestamp, network_name, network_ssid, username, a, response_status, response_message 
+    FROM login_attempts 
+    WHERE 1=1
+"""
+
+SQL_STATS_TOTALS = "SELECT COUNT(*), MAX(timestamp) FROM login_attempts"
+
+# Answered from the idx_la_success partial index
+SQL_STATS_SUCCESSFUL = "SELECT COUNT(*) FROM login_attempts WHERE response_status = '200'"
+
+SQL_NETWORK_STATS = """
+    SELECT 
+        network_name,
+        network_ssid,
+        COUNT(*) as total_attempts,
+        SUM(CASE WHEN response_status = '200' THEN 1 ELSE 0 END) as successful_attempts,
+        MAX(timestamp) as last_attempt
+    FROM login_attempts 
+    WHERE network_name IS NOT NULL
+    GROUP BY network_name, network_ssid
+    ORDER BY total_attempts DESC
+"""
+
+# The timestamp range is served by idx_la_ts
+SQL_HOURLY = """
+    SELECT 
+        strftime('%Y-%m-%d %H', timestamp) as hour,
+        COUNT(*) as total_attempts,
+        SUM(CASE WHEN response_status = '200' THEN 1 ELSE 0 END) as successful_attempts
+    FROM login_attempts 
+    WHERE timestamp >= ?
+    GROUP BY hour
+    ORDER BY hour
+"""
+
+SQL_INSERT_ATTEMPT = """
+    INSERT INTO login_attempts (timestamp, network_name, network_ssid, username, password, a, response_status, response_message)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_STATUS_CLAUSES = {
+    None: "",
+    "success": " AND response_status = '200'",
+    "failed": " AND response_status != '200'",
+}
+
+def _build_attempts_query(has_start: bool, has_end: bool, status_filter: Optional[str], has_network: bool) -> str:
+    """Compose one fully-formed variant of the recent-attempts query"""
+    query = SQL_ATTEMPTS_BASE
+    if has_start:
+        query += " AND timestamp >= ?"
+    if has_end:
+        query += " AND timestamp <= ?"
+    query += _STATUS_CLAUSES[status_filter]
+    if has_network:
+        query += " AND network_name = ?"
+    return query + " ORDER BY timestamp DESC LIMIT ?"
+
+# Keyed by (has_start, has_end, status_filter, has_network)
+SQL_ATTEMPTS = {
+    (has_start, has_end, status_filter, has_network): _build_attempts_query(has_start, has_end, status_filter, has_network)
+    for has_start in (False, True)
+    for has_end in (False, True)
+    for status_filter in _STATUS_CLAUSES
+    for has_network in (False, True)
+}
+
+def _open_connection():
+    """Open a tuned SQLite connection that can be shared across worker threads"""
+    conn = sqlite3.connect(
+        DB_NAME,
+        check_same_thread=False,
+        isolation_level=None
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    return conn
+
+def init_database():
+    """
+    Create or migrate the login_attempts table. Runs once at startup.
     
+    The migration always adds the network columns, so queries never need to
+    check the schema at request time.
+    """
     if not os.path.exists(DB_NAME):
         logger.warning(f"Database {DB_NAME} not found. Creating new database.")
     
-    # Ensure table exists with multi-network support
+    conn = _open_connection()
     cursor = conn.cursor()
     
     # Check if table exists and get its schema
@@ -161,100 +294,99 @@ def get_db_connection():
             cursor.execute("ALTER TABLE login_attempts ADD COLUMN network_ssid TEXT")
             logger.info("Added network_ssid column to existing table")
     
-    conn.commit()
-    return conn
+    # Equality column first, timestamp last so the filtered attempts queries need no sort step.
+    # idx_la_name_ts matches the CLI's definition, so whichever runs first creates it.
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_la_ts ON login_attempts(timestamp DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_la_status_ts ON login_attempts(response_status, timestamp)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_la_name_ts ON login_attempts(network_name, timestamp DESC)")
+    # Grouping order for the per-network statistics
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_la_net_ts ON login_attempts(network_name, network_ssid, timestamp)")
+    # Partial index lets the successful-attempts count skip the table entirely
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_la_success ON login_attempts(response_status) WHERE response_status = '200'")
+    
+    conn.close()
+
+class ConnectionPool:
+    """Fixed-size pool of long-lived SQLite connections"""
+    
+    def __init__(self, size: int = DB_POOL_SIZE):
+        self._connections = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._connections.put(_open_connection())
+    
+    @contextmanager
+    def acquire(self):
+        """Borrow a connection for the duration of a ``with`` block"""
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+init_database()
+_pool = ConnectionPool()
 
-def get_login_attempts(filters: FilterParams, network_filter: Optional[str] = None) -> List[Dict]:
+# --- STATS CACHE ---
+STATS_CACHE_TTL = 10  # seconds
+
+_TTL_CACHE = {}
+_TTL_CACHE_LOCK = threading.Lock()
+
+def ttl_cache(seconds: float = STATS_CACHE_TTL):
+    """Memoize a function's result per argument tuple for a few seconds"""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__name__, args, tuple(sorted(kwargs.items())))
+            now = time.monotonic()
+            with _TTL_CACHE_LOCK:
+                entry = _TTL_CACHE.get(key)
+                if entry is not None and entry[1] > now:
+                    return entry[0]
+            
+            value = func(*args, **kwargs)
+            with _TTL_CACHE_LOCK:
+                _TTL_CACHE[key] = (value, now + seconds)
+            return value
+        return wrapper
+    return decorator
+
+def clear_stats_cache():
+    """Drop all cached statistics so the next request hits the database"""
+    with _TTL_CACHE_LOCK:
+        _TTL_CACHE.clear()
+
+def get_login_attempts(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    network_filter: Optional[str] = None,
+    limit: int = 50
+) -> List[Dict]:
     """Get login attempts with filters"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    # Unknown status filters are ignored, as before
+    if status_filter not in _STATUS_CLAUSES:
+        status_filter = None
     
-    # Check if table has network columns
-    cursor.execute("PRAGMA table_info(login_attempts)")
-    columns = [row[1] for row in cursor.fetchall()]
-    has_network_columns = 'network_name' in columns and 'network_ssid' in columns
-    
-    if has_network_columns:
-        query = """
-            SELECT id, timestamp, network_name, network_ssid, username, a, response_status, response_message 
-            FROM login_attempts 
-            WHERE 1=1
-        """
-    else:
-        query = """
-            SELECT id, timestamp, username, a, response_status, response_message 
-            FROM login_attempts 
-            WHERE 1=1
-        """
+    query = SQL_ATTEMPTS[(bool(start_date), bool(end_date), status_filter, bool(network_filter))]
     
-    params = []
+    params = [value for value in (start_date, end_date, network_filter) if value]
+    params.append(limit)
     
-    if filters.start_date:
-        query += " AND timestamp >= ?"
-        params.append(filters.start_date)
-    
-    if filters.end_date:
-        query += " AND timestamp <= ?"
-        params.append(filters.end_date)
-    
-    if filters.status_filter:
-        if filters.status_filter == "success":
-            query += " AND response_status = '200'"
-        elif filters.status_filter == "failed":
-            query += " AND response_status != '200'"
-    
-    if network_filter and has_network_columns:
-        query += " AND network_name = ?"
-        params.append(network_filter)
+    with _pool.acquire() as conn:
+        rows = conn.execute(query, params).fetchall()
     
-    query += " ORDER BY timestamp DESC LIMIT ?"
-    params.append(filters.limit)
-    
-    cursor.execute(query, params)
-    rows = cursor.fetchall()
-    conn.close()
-    
-    if has_network_columns:
-        return [
-            {
-                "id": row[0],
-                "timestamp": row[1],
-                "network_name": row[2],
-                "network_ssid": row[3],
-                "username": row[4],
-                "a": row[5],
-                "response_status": row[6],
-                "response_message": row[7]
-            }
-            for row in rows
-        ]
-    else:
-        return [
-            {
-                "id": row[0],
-                "timestamp": row[1],
-                "network_name": "Legacy",
-                "network_ssid": "Unknown",
-                "username": row[2],
-                "a": row[3],
-                "response_status": row[4],
-                "response_message": row[5]
-            }
-            for row in rows
-        ]
+    return [dict(row) for row in rows]
 
+@ttl_cache()
 def get_dashboard_stats() -> DashboardStats:
     """Get dashboard statistics"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Total attempts
-    cursor.execute("SELECT COUNT(*) FROM login_attempts")
-    total_attempts = cursor.fetchone()[0]
-    
-    # Successful attempts (assuming 200 is success)
-    cursor.execute("SELECT COUNT(*) FROM login_attempts WHERE response_status = '200'")
-    successful_attempts = cursor.fetchone()[0]
+    with _pool.acquire() as conn:
+        # Total attempts and last attempt in a single pass
+        total_attempts, last_attempt = conn.execute(SQL_STATS_TOTALS).fetchone()
+        
+        # Successful attempts (assuming 200 is success)
+        successful_attempts = conn.execute(SQL_STATS_SUCCESSFUL).fetchone()[0]
     
     # Failed attempts
     failed_attempts = total_attempts - successful_attempts
@@ -262,14 +394,8 @@ def get_dashboard_stats() -> DashboardStats:
     # Success rate
     success_rate = (successful_attempts / total_attempts * 100) if total_attempts > 0 else 0
     
-    # Last attempt
-    cursor.execute("SELECT timestamp FROM login_attempts ORDER BY timestamp DESC LIMIT 1")
-    last_attempt_row = cursor.fetchone()
-    last_attempt = last_attempt_row[0] if last_attempt_row else None
-    
-    conn.close()
-    
-    return DashboardStats(
+    # Values come straight from SQLite, so skip Pydantic validation
+    return DashboardStats.model_construct(
         total_attempts=total_attempts,
         successful_attempts=successful_attempts,
         failed_attempts=failed_attempts,
@@ -277,35 +403,11 @@ def get_dashboard_stats() -> DashboardStats:
         last_attempt=last_attempt
     )
 
+@ttl_cache()
 def get_network_stats() -> List[Dict]:
     """Get statistics per network profile"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Check if table has network columns
-    cursor.execute("PRAGMA table_info(login_attempts)")
-    columns = [row[1] for row in cursor.fetchall()]
-    has_network_columns = 'network_name' in columns and 'network_ssid' in columns
-    
-    if not has_network_columns:
-        return []
-    
-    query = """
-        SELECT 
-            network_name,
-            network_ssid,
-            COUNT(*) as total_attempts,
-            SUM(CASE WHEN response_status = '200' THEN 1 ELSE 0 END) as successful_attempts,
-            MAX(timestamp) as last_attempt
-        FROM login_attempts 
-        WHERE network_name IS NOT NULL
-        GROUP BY network_name, network_ssid
-        ORDER BY total_attempts DESC
-    """
-    
-    cursor.execute(query)
-    rows = cursor.fetchall()
-    conn.close()
+    with _pool.acquire() as conn:
+        rows = conn.execute(SQL_NETWORK_STATS).fetchall()
     
     stats = []
     for row in rows:
@@ -325,27 +427,14 @@ def get_network_stats() -> List[Dict]:
     
     return stats
 
+@ttl_cache()
 def get_hourly_stats(days: int = 7) -> List[Dict]:
     """Get hourly login attempt statistics for the last N days"""
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
     start_date = datetime.now() - timedelta(days=days)
     
-    query = """
-        SELECT 
-            strftime('%Y-%m-%d %H', timestamp) as hour,
-            COUNT(*) as total_attempts,
-            SUM(CASE WHEN response_status = '200' THEN 1 ELSE 0 END) as successful_attempts
-        FROM login_attempts 
-        WHERE timestamp >= ?
-        GROUP BY strftime('%Y-%m-%d %H', timestamp)
-        ORDER BY hour
-    """
-    
-    cursor.execute(query, (start_date.isoformat(),))
-    rows = cursor.fetchall()
-    conn.close()
+    # Timestamps are stored as "YYYY-MM-DD HH:MM:SS", so compare with the same separator
+    with _pool.acquire() as conn:
+        rows = conn.execute(SQL_HOURLY, (start_date.isoformat(sep=' '),)).fetchall()
     
     return [
         {
@@ -357,15 +446,39 @@ def get_hourly_stats(days: int = 7) -> List[Dict]:
         for row in rows
     ]
 
+def bulk_log_attempts(rows: List[tuple]) -> None:
+    """
+    Insert many login attempts in a single transaction.
+    
+    Each row is (timestamp, network_name, network_ssid, username, password, a,
+    response_status, response_message).
+    """
+    if not rows:
+        return
+    
+    with _pool.acquire() as conn:
+        conn.execute("BEGIN")
+        try:
+            inserted = conn.executemany(SQL_INSERT_ATTEMPT, rows).rowcount
+            conn.execute("COMMIT")
+        except BaseException:
+            # Never hand a connection with an open transaction back to the pool
+            conn.execute("ROLLBACK")
+            raise
+    
+    clear_stats_cache()
+    logger.debug(f"Logged {inserted} login attempts")
+
 # --- ROUTES ---
+# Routes that touch SQLite are plain ``def`` so FastAPI runs them in its threadpool
+# instead of blocking the event loop while a query runs.
 @app.get("/", response_class=HTMLResponse)
-async def dashboard(request: Request, username: str = Depends(authenticate)):
+def dashboard(request: Request, username: str = Depends(authenticate)):
     """Main dashboard page"""
     logger.info(f"Dashboard accessed by user: {username}")
     
     # Get recent login attempts
-    filters = FilterParams(limit=10)
-    recent_attempts = get_login_attempts(filters)
+    recent_attempts = get_login_attempts(limit=10)
     
     # Get statistics
     stats = get_dashboard_stats()
@@ -379,39 +492,31 @@ async def dashboard(request: Request, username: str = Depends(authenticate)):
         "username": username
     })
 
-@app.get("/api/attempts")
-async def get_attempts_api(
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    status_filter: Optional[str] = None,
-    network_filter: Optional[str] = None,
-    limit: int = 50,
+@app.get("/api/attempts", response_model=AttemptsResponse)
+def get_attempts_api(
+    start_date: Optional[str] = Query(None, max_length=MAX_FILTER_LENGTH),
+    end_date: Optional[str] = Query(None, max_length=MAX_FILTER_LENGTH),
+    status_filter: Optional[str] = Query(None, max_length=MAX_FILTER_LENGTH),
+    network_filter: Optional[str] = Query(None, max_length=MAX_FILTER_LENGTH),
+    limit: int = Query(50, ge=1, le=MAX_ATTEMPTS_LIMIT),
     username: str = Depends(authenticate)
 ):
     """API endpoint to get login attempts with filters"""
-    filters = FilterParams(
-        start_date=start_date,
-        end_date=end_date,
-        status_filter=status_filter,
-        network_filter=network_filter,
-        limit=limit
-    )
-    
-    attempts = get_login_attempts(filters, network_filter)
+    attempts = get_login_attempts(start_date, end_date, status_filter, network_filter, limit)
     logger.info(f"API call: Retrieved {len(attempts)} login attempts")
     
     return {"attempts": attempts}
 
-@app.get("/api/stats")
-async def get_stats_api(username: str = Depends(authenticate)):
+@app.get("/api/stats", response_model=StatsResponse)
+def get_stats_api(username: str = Depends(authenticate)):
     """API endpoint to get dashboard statistics"""
     stats = get_dashboard_stats()
     logger.info("API call: Retrieved dashboard statistics")
     
     return {"stats": stats}
 
-@app.get("/api/network-stats")
-async def get_network_stats_api(username: str = Depends(authenticate)):
+@app.get("/api/network-stats", response_model=NetworkStatsResponse)
+def get_network_stats_api(username: str = Depends(authenticate)):
     """API endpoint to get network-specific statistics"""
     network_stats = get_network_stats()
     logger.info("API call: Retrieved network statistics")
@@ -419,13 +524,23 @@ async def get_network_stats_api(username: str = Depends(authenticate)):
     return {"network_stats": network_stats}
     return stats
 
-@app.get("/api/hourly-stats")
-async def get_hourly_stats_api(days: int = 7, username: str = Depends(authenticate)):
+@app.get("/api/hourly-stats", response_model=HourlyStatsResponse)
+def get_hourly_stats_api(
+    days: int = Query(7, ge=1, le=MAX_HOURLY_DAYS),
+    username: str = Depends(authenticate)
+):
     """API endpoint to get hourly statistics"""
     stats = get_hourly_stats(days)
     logger.info(f"API call: Retrieved hourly statistics for last {days} days")
     return {"hourly_stats": stats}
 
+@app.post("/api/cache/flush")
+async def flush_cache_api(username: str = Depends(authenticate)):
+    """API endpoint to invalidate cached statistics"""
+    clear_stats_cache()
+    logger.info(f"API call: Statistics cache flushed by user: {username}")
+    return {"status": "flushed"}
+
 @app.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
     """Login page (for custom authentication if needed)"""
@@ -5,177 +5,248 @@ Handles network detection, SSID identification, and network profile management.
 
 import subprocess
 import platform
+import locale
 import re
+import time
 import json
 import os
-from typing import Optional, Dict, List, Tuple
+from typing import Callable, Optional, Dict, List, Tuple
 from config.logging_config import get_logger
 
 logger = get_logger(__name__)
 
+# Tool output is searched as raw bytes; only the matched SSID gets decoded.
+# "^\s*SSID" skips the BSSID line in netsh output.
+_WIN_SSID_RE = re.compile(rb'^[ \t]*SSID[ \t]*:[ \t]*(.+)$', re.MULTILINE)
+_LINUX_ESSID_RE = re.compile(rb'ESSID:"([^"]*)"')
+
+# Same encoding subprocess uses for text=True
+_OUTPUT_ENCODING = locale.getpreferredencoding(False)
+
+_AIRPORT_CMD = ["/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport", "-I"]
+
+# How long a detected SSID is reused before shelling out to the OS again
+SSID_CACHE_TTL = 5.0
+
 class NetworkDetector:
     """Handles network detection and SSID identification across different platforms."""
     
     def __init__(self):
         self.platform = platform.system().lower()
+        self._ssid_cache = (None, float("-inf"))
         logger.debug(f"Initialized NetworkDetector for platform: {self.platform}")
     
     def get_current_ssid(self) -> Optional[str]:
         """
         Get the SSID of the currently connected WiFi network.
         
+        Results are cached for SSID_CACHE_TTL seconds to avoid spawning the
+        platform tools on every call.
+        
         Returns:
             str: SSID of current network, or None if not connected to WiFi
         """
-        try:
-            if self.platform == "windows":
-                return self._get_ssid_windows()
-            elif self.platform == "darwin":  # macOS
-                return self._get_ssid_macos()
-            elif self.platform == "linux":
-                return self._get_ssid_linux()
-            else:
-                logger.warning(f"Unsupported platform: {self.platform}")
-                return None
-        except Exception as e:
-            logger.error(f"Failed to get current SSID: {e}")
-            return None
-    
-    def _get_ssid_windows(self) -> Optional[str]:
-        """Get SSID on Windows using netsh command."""
-        try:
-            # Use netsh to get WiFi profile information
-            cmd = ["netsh", "wlan", "show", "profiles"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            # Get the currently connected profile
-            cmd_interfaces = ["netsh", "wlan", "show", "interfaces"]
-            interfaces_result = subprocess.run(cmd_interfaces, capture_output=True, text=True, check=True)
-            
-            # Parse the SSID from the interfaces output
-            for line in interfaces_result.stdout.split('\n'):
-                if 'SSID' in line and 'BSSID' not in line:
-                    # Extract SSID (format: "    SSID                   : NetworkName")
-                    match = re.search(r'SSID\s*:\s*(.+)', line.strip())
-                    if match:
-                        ssid = match.group(1).strip()
-                        logger.debug(f"Detected Windows SSID: {ssid}")
-                        return ssid
-            
-            logger.debug("No active WiFi connection found on Windows")
-            return None
-            
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Windows netsh command failed: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Error getting Windows SSID: {e}")
-            return None
+        ssid, fetched_at = self._ssid_cache
+        if time.monotonic() - fetched_at < SSID_CACHE_TTL:
+            return ssid
+        
+        ssid = self._detect_ssid()
+        self._ssid_cache = (ssid, time.monotonic())
+        return ssid
     
-    def _get_ssid_macos(self) -> Optional[str]:
-        """Get SSID on macOS using airport utility."""
-        try:
-            # Try using networksetup first
-            cmd = ["networksetup", "-getairportnetwork", "en0"]
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            # Parse output (format: "Current Wi-Fi Network: NetworkName")
-            if "Current Wi-Fi Network:" in result.stdout:
-                ssid = result.stdout.split("Current Wi-Fi Network:")[-1].strip()
-                if ssid and ssid != "You are not associated with an AirPort network.":
-                    logger.debug(f"Detected macOS SSID: {ssid}")
-                    return ssid
-            
-            # Fallback to airport utility
-            airport_cmd = ["/System/Library/PrivateFrameworks/Apple80211.framework/Versions/Current/Resources/airport", "-I"]
-            airport_result = subprocess.run(airport_cmd, capture_output=True, text=True, check=True)
-            
-            for line in airport_result.stdout.split('\n'):
-                if 'SSID:' in line:
-                    ssid = line.split('SSID:')[-1].strip()
-                    logger.debug(f"Detected macOS SSID via airport: {ssid}")
-                    return ssid
-            
-            logger.debug("No active WiFi connection found on macOS")
-            return None
-            
-        except subprocess.CalledProcessError as e:
-            logger.error(f"macOS network command failed: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Error getting macOS SSID: {e}")
+    def _detect_ssid(self) -> Optional[str]:
+        """Query the operating system for the current SSID."""
+        commands = _SSID_COMMANDS.get(self.platform)
+        if commands is None:
+            logger.warning(f"Unsupported platform: {self.platform}")
             return None
-    
-    def _get_ssid_linux(self) -> Optional[str]:
-        """Get SSID on Linux using various methods."""
-        methods = [
-            self._linux_iwgetid,
-            self._linux_nmcli,
-            self._linux_iwconfig
-        ]
         
-        for method in methods:
+        for cmd, parse in commands:
             try:
-                ssid = method()
-                if ssid:
-                    logger.debug(f"Detected Linux SSID: {ssid}")
-                    return ssid
+                result = subprocess.run(cmd, capture_output=True, check=True)
+                ssid = parse(result.stdout)
             except Exception as e:
-                logger.debug(f"Linux method {method.__name__} failed: {e}")
+                logger.debug(f"SSID command {cmd[0]} failed: {e}")
                 continue
+            if ssid:
+                logger.debug(f"Detected {self.platform} SSID via {cmd[0]}: {ssid}")
+                return ssid
         
-        logger.debug("No active WiFi connection found on Linux")
+        logger.debug(f"No active WiFi connection found on {self.platform}")
         return None
     
-    def _linux_iwgetid(self) -> Optional[str]:
-        """Get SSID using iwgetid command."""
-        cmd = ["iwgetid", "-r"]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        ssid = result.stdout.strip()
-        return ssid if ssid else None
+    # --- Async detection (for use inside an event loop, e.g. FastAPI handlers) ---
     
-    def _linux_nmcli(self) -> Optional[str]:
-        """Get SSID using NetworkManager's nmcli."""
-        cmd = ["nmcli", "-t", "-f", "active,ssid", "dev", "wifi"]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    async def get_current_ssid_async(self) -> Optional[str]:
+        """
+        Async counterpart of get_current_ssid() that does not block the event loop.
         
-        for line in result.stdout.split('\n'):
-            if line.startswith('yes:'):
-                ssid = line.split(':', 1)[1]
-                return ssid if ssid else None
-        return None
+        Shares the SSID cache with the synchronous API.
+        
+        Returns:
+            str: SSID of current network, or None if not connected to WiFi
+        """
+        ssid, fetched_at = self._ssid_cache
+        if time.monotonic() - fetched_at < SSID_CACHE_TTL:
+            return ssid
+        
+        ssid = await self._detect_ssid_async()
+        self._ssid_cache = (ssid, time.monotonic())
+        return ssid
     
-    def _linux_iwconfig(self) -> Optional[str]:
-        """Get SSID using iwconfig command."""
-        cmd = ["iwconfig"]
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+    async def _detect_ssid_async(self) -> Optional[str]:
+        """Query the operating system for the current SSID without blocking."""
+        commands = _SSID_COMMANDS.get(self.platform)
+        if commands is None:
+            logger.warning(f"Unsupported platform: {self.platform}")
+            return None
+        
+        for cmd, parse in commands:
+            try:
+                ssid = parse(await _run_command_async(cmd))
+            except Exception as e:
+                logger.debug(f"SSID command {cmd[0]} failed: {e}")
+                continue
+            if ssid:
+                logger.debug(f"Detected {self.platform} SSID via {cmd[0]}: {ssid}")
+                return ssid
         
-        for line in result.stdout.split('\n'):
-            if 'ESSID:' in line:
-                match = re.search(r'ESSID:"([^"]*)"', line)
-                if match:
-                    return match.group(1)
+        logger.debug(f"No active WiFi connection found on {self.platform}")
         return None
 
 
+async def _run_command_async(cmd: List[str]) -> bytes:
+    """Run a command without blocking the event loop and return its stdout."""
+    # Imported here so the synchronous CLI doesn't pay for asyncio at startup
+    import asyncio
+    
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, stdout, stderr)
+    return stdout
+
+
+def _parse_iwgetid_ssid(output: bytes) -> Optional[str]:
+    """Extract the SSID from `iwgetid -r` output."""
+    ssid = output.strip().decode(_OUTPUT_ENCODING, errors="replace")
+    return ssid or None
+
+
+def _parse_networksetup_ssid(output: bytes) -> Optional[str]:
+    """Extract the SSID from `networksetup -getairportnetwork` output."""
+    output = output.decode(_OUTPUT_ENCODING, errors="replace")
+    # Format: "Current Wi-Fi Network: NetworkName"
+    if "Current Wi-Fi Network:" not in output:
+        return None
+    ssid = output.split("Current Wi-Fi Network:")[-1].strip()
+    if ssid and ssid != "You are not associated with an AirPort network.":
+        return ssid
+    return None
+
+
+def _parse_airport_ssid(output: bytes) -> Optional[str]:
+    """Extract the SSID from `airport -I` output."""
+    for line in output.decode(_OUTPUT_ENCODING, errors="replace").split('\n'):
+        # Skip the BSSID line, which precedes SSID in airport's output
+        if line.strip().startswith('SSID:'):
+            return line.split('SSID:')[-1].strip() or None
+    return None
+
+
+def _parse_netsh_ssid(output: bytes) -> Optional[str]:
+    """Extract the SSID from `netsh wlan show interfaces` output."""
+    # Format: "    SSID                   : NetworkName"
+    match = _WIN_SSID_RE.search(output)
+    if not match:
+        return None
+    ssid = match.group(1).strip().decode(_OUTPUT_ENCODING, errors="replace")
+    return ssid or None
+
+
+def _parse_nmcli_ssid(output: bytes) -> Optional[str]:
+    """Extract the active SSID from `nmcli -t -f active,ssid dev wifi` output."""
+    # Jump straight to the active line instead of scanning every line
+    _, found, rest = (b'\n' + output).partition(b'\nyes:')
+    if not found:
+        return None
+    ssid = rest.split(b'\n', 1)[0].rstrip(b'\r').decode(_OUTPUT_ENCODING, errors="replace")
+    return ssid or None
+
+
+def _parse_iwconfig_ssid(output: bytes) -> Optional[str]:
+    """Extract the ESSID from `iwconfig` output."""
+    match = _LINUX_ESSID_RE.search(output)
+    if not match:
+        return None
+    return match.group(1).decode(_OUTPUT_ENCODING, errors="replace")
+
+
+# Commands tried in order on each platform, paired with a parser for their raw stdout.
+# Shared by the sync and async detection paths.
+_SSID_COMMANDS: Dict[str, List[Tuple[List[str], Callable[[bytes], Optional[str]]]]] = {
+    "windows": [
+        (["netsh", "wlan", "show", "interfaces"], _parse_netsh_ssid),
+    ],
+    "darwin": [
+        (["networksetup", "-getairportnetwork", "en0"], _parse_networksetup_ssid),
+        (_AIRPORT_CMD, _parse_airport_ssid),
+    ],
+    "linux": [
+        (["iwgetid", "-r"], _parse_iwgetid_ssid),
+        (["nmcli", "-t", "-f", "active,ssid", "dev", "wifi"], _parse_nmcli_ssid),
+        (["iwconfig"], _parse_iwconfig_ssid),
+    ],
+}
+
+
+# Shared detector so every caller benefits from the SSID cache
+_default_detector = NetworkDetector()
+
+# Parsed config files keyed by path: {path: ((mtime_ns, size), config)}
+_CONFIG_CACHE: Dict[str, Tuple[Tuple[int, int], Dict]] = {}
+
+
+def invalidate_config_cache(config_path: str = "config.json") -> None:
+    """Forget the parsed copy of config_path so the next load re-reads the file."""
+    _CONFIG_CACHE.pop(config_path, None)
+
+
 class NetworkProfileManager:
     """Manages network profiles and configuration loading."""
     
     def __init__(self, config_path: str = "config.json"):
         self.config_path = config_path
-        self.detector = NetworkDetector()
+        self.detector = _default_detector
         logger.debug(f"Initialized NetworkProfileManager with config: {config_path}")
     
     def load_config(self) -> Dict:
-        """Load and parse configuration file."""
+        """
+        Load and parse configuration file.
+        
+        The parsed config is cached per path and only re-read when the
+        file's modification time or size changes.
+        """
         if not os.path.exists(self.config_path):
             raise FileNotFoundError(
                 f"Missing {self.config_path}. Please copy config.example.json to {self.config_path} and configure your networks."
             )
         
+        # Nanosecond mtime plus size, so a same-tick rewrite on a coarse-timestamp filesystem is still noticed
+        st = os.stat(self.config_path)
+        signature = (st.st_mtime_ns, st.st_size)
+        cached = _CONFIG_CACHE.get(self.config_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        
         with open(self.config_path, "r") as f:
             config = json.load(f)
         
+        _CONFIG_CACHE[self.config_path] = (signature, config)
         logger.debug(f"Loaded configuration from {self.config_path}")
         return config
     
@@ -284,8 +355,12 @@ class NetworkProfileManager:
 # Convenience functions for backward compatibility
 def get_current_ssid() -> Optional[str]:
     """Get the SSID of the currently connected WiFi network."""
-    detector = NetworkDetector()
-    return detector.get_current_ssid()
+    return _default_detector.get_current_ssid()
+
+
+async def get_current_ssid_async() -> Optional[str]:
+    """Get the SSID of the currently connected WiFi network without blocking the event loop."""
+    return await _default_detector.get_current_ssid_async()
 
 
 def get_network_profile(network_name: Optional[str] = None, auto_detect: bool = True) -> Tuple[str, Dict]:
@@ -1,7 +1,10 @@
-import sqlite3
-import requests
+# requests and sqlite3 are imported where they are used, so commands that
+# need neither (--setup, --list-networks, --detect-network, ...) start faster.
 import datetime
+import atexit
+import functools
 import re
+import time
 import argparse
 import json
 import os
@@ -10,16 +13,28 @@ import os
 # --- CONFIGURATION ---
 CONFIG_PATH = "config.json"
 
+# Parsed config and the (mtime_ns, size) it was read at; see load_config()
+_CFG_CACHE = None
+_CFG_SIGNATURE = None
+
 def load_config():
-    """Load configuration file and return config dict"""
+    """Load configuration file and return config dict, re-reading only when it changes"""
+    global _CFG_CACHE, _CFG_SIGNATURE
     if not os.path.exists(CONFIG_PATH):
         raise FileNotFoundError(
             "Missing config.json. Please copy config.example.json to config.json and fill in your details."
         )
     
+    st = os.stat(CONFIG_PATH)
+    signature = (st.st_mtime_ns, st.st_size)
+    if _CFG_CACHE is not None and signature == _CFG_SIGNATURE:
+        return _CFG_CACHE
+    
     with open(CONFIG_PATH, "r") as f:
         config = json.load(f)
     
+    _CFG_CACHE = config
+    _CFG_SIGNATURE = signature
     return config
 
 # Initialize logging first
@@ -29,27 +44,106 @@ logger = get_logger(__name__)
 
 # Import network utilities for multi-network support
 try:
-    from network_utils import NetworkProfileManager, get_current_ssid
+    from network_utils import NetworkProfileManager, get_current_ssid, invalidate_config_cache
     MULTI_NETWORK_SUPPORT = True
     logger.info("Multi-network support enabled")
 except ImportError as e:
     logger.warning(f"Multi-network support disabled: {e}")
     MULTI_NETWORK_SUPPORT = False
 
+@functools.lru_cache(maxsize=1)
+def _manager():
+    """Return the shared NetworkProfileManager."""
+    return NetworkProfileManager()
+
 # Global variables - will be loaded when needed
 URL = None
 USERNAME = None
 PASSWORD = None
 PRODUCT_TYPE = None
 
+# Shared HTTP session, created on first use by _get_session()
+_SESSION = None
+
+def _get_session():
+    """Return the shared HTTP session so repeated requests reuse the same connection."""
+    global _SESSION
+    if _SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        # Retry connection failures and transient gateway errors on the pooled connection
+        adapter = HTTPAdapter(
+            pool_connections=2,
+            pool_maxsize=4,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.2,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False  # hand back the last response, as before retries existed
+            )
+        )
+        _SESSION = requests.Session()
+        _SESSION.mount("http://", adapter)
+        _SESSION.mount("https://", adapter)
+    return _SESSION
+
 # --- DATABASE SETUP ---
 DB_NAME = "wifi_log.db"
 
+# Shared connection, opened on first use by _get_db()
+_DB = None
+
+# Stored in PRAGMA user_version once setup_database() has fully migrated the file;
+# bump it whenever setup_database() gains a new migration step
+SCHEMA_VERSION = 2
+
+# Set once setup_database() has checked the schema in this process
+_SCHEMA_READY = False
+
+# Login attempts waiting to be written; flushed in one transaction once
+# LOG_FLUSH_SIZE rows pile up or the oldest has waited LOG_FLUSH_INTERVAL seconds
+LOG_FLUSH_SIZE = 20
+LOG_FLUSH_INTERVAL = 5.0
+_pending_logs = []
+_pending_since = None
+
+def _get_db():
+    """Return the shared database connection, opening it on first use."""
+    global _DB
+    if _DB is None:
+        import sqlite3
+        _DB = sqlite3.connect(DB_NAME, check_same_thread=False)
+        _DB.execute("PRAGMA journal_mode=WAL")
+        _DB.execute("PRAGMA synchronous=NORMAL")
+    return _DB
+
+def _close_db():
+    """Write any buffered login attempts and close the shared database connection."""
+    global _DB
+    _flush_logs()
+    if _DB is not None:
+        _DB.close()
+        _DB = None
+
+atexit.register(_close_db)
+
 def setup_database():
-    """Create the database and table if they do not exist."""
-    conn = sqlite3.connect(DB_NAME)
+    """Create the database and table if they do not exist. Runs once per process."""
+    global _SCHEMA_READY
+    if _SCHEMA_READY:
+        return
+    
+    conn = _get_db()
     cursor = conn.cursor()
     
+    # Already migrated by an earlier run
+    cursor.execute("PRAGMA user_version")
+    if cursor.fetchone()[0] >= SCHEMA_VERSION:
+        _SCHEMA_READY = True
+        return
+    
     # Check if the table exists and get its schema
     cursor.execute("PRAGMA table_info(login_attempts)")
     columns = [row[1] for row in cursor.fetchall()]
@@ -79,36 +173,106 @@ def setup_database():
         if 'network_ssid' not in columns:
             cursor.execute("ALTER TABLE login_attempts ADD COLUMN network_ssid TEXT")
             logger.info("Added network_ssid column to existing table")
+    
+    # Indexes for view_logs: idx_la_ts is shared with the dashboard, idx_la_name_ts serves --network-filter
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_la_ts ON login_attempts(timestamp DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_la_name_ts ON login_attempts(network_name, timestamp DESC)")
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
     conn.commit()
-    conn.close()
+    _SCHEMA_READY = True
 
-def log_attempt(username, password, a, response_status, response_message, network_name=None, network_ssid=None):
-    """Log each login attempt in the database."""
-    conn = sqlite3.connect(DB_NAME)
+def log_attempt(username, password, a, response_status, response_message, network_name=None, network_ssid=None,
+                timestamp=None):
+    """
+    Log each login attempt in the database.
+    
+    Attempts are buffered and written once LOG_FLUSH_SIZE rows are waiting or
+    the oldest has waited LOG_FLUSH_INTERVAL seconds. wifi_login() flushes
+    after every attempt; call _flush_logs() to force a write. `timestamp`
+    defaults to the current time.
+    """
+    global _pending_since
+    if timestamp is None:
+        timestamp = datetime.datetime.now()
+    # Bind a plain string rather than relying on sqlite3's deprecated datetime adapter
+    timestamp = timestamp.isoformat(sep=' ', timespec='microseconds')
+    if not _pending_logs:
+        _pending_since = time.monotonic()
+    _pending_logs.append(
+        (timestamp, network_name, network_ssid, username, "******", a, response_status, response_message)
+    )
+    if len(_pending_logs) >= LOG_FLUSH_SIZE or time.monotonic() - _pending_since >= LOG_FLUSH_INTERVAL:
+        _flush_logs()
+
+def _flush_logs():
+    """Write all buffered login attempts in a single transaction."""
+    if not _pending_logs:
+        return
+    
+    conn = _get_db()
     cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO login_attempts (timestamp, network_name, network_ssid, username, password, a, response_status, response_message)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (datetime.datetime.now(), network_name, network_ssid, username, "******", a, response_status, response_message))
+    cursor.execute("BEGIN")
+    try:
+        cursor.executemany("""
+            INSERT INTO login_attempts (timestamp, network_name, network_ssid, username, password, a, response_status, response_message)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, _pending_logs)
+    except BaseException:
+        # Don't leave the transaction open for the next flush
+        conn.rollback()
+        raise
     conn.commit()
-    conn.close()
+    _pending_logs.clear()
 
 # --- HELPER FUNCTIONS ---
+# [\s\S] matches across newlines without depending on flags
+_MESSAGE_RE = re.compile(r"<message><!\[CDATA\[([\s\S]*?)\]\]></message>")
+
 def extract_message(response_text):
     """Extracts the meaningful message from the XML response."""
-    match = re.search(r"<message><!\[CDATA\[(.*?)\]\]></message>", response_text)
+    # Cheap substring check skips the regex engine entirely when the tag is absent
+    if "<message>" not in response_text:
+        return "Unknown response"
+    match = _MESSAGE_RE.search(response_text)
     return match.group(1) if match else "Unknown response"
 
+# The <message> tag sits near the top of portal responses
+MESSAGE_SCAN_BYTES = 8192
+
+def extract_response_message(response):
+    """Extracts the message from a portal response, decoding only the start of the body when possible."""
+    try:
+        head = response.content[:MESSAGE_SCAN_BYTES].decode(response.encoding or "utf-8", errors="replace")
+    except LookupError:
+        # Unknown charset from the portal; response.text knows how to fall back
+        return extract_message(response.text)
+    message = extract_message(head)
+    if message == "Unknown response" and len(response.content) > MESSAGE_SCAN_BYTES:
+        # Tag not in the first chunk; fall back to the full body
+        message = extract_message(response.text)
+    return message
+
 # --- MAIN WIFI LOGIN FUNCTION ---
+# Constant part of the login form; per-attempt fields are filled in by wifi_login()
+_PAYLOAD_TEMPLATE = {
+    "mode": "191",
+    "username": None,
+    "password": None,
+    "a": None,
+    "producttype": "0"
+}
+
 def wifi_login(network_name=None):
     """Perform the WiFi login request and log the result."""
+    import requests
+    
     network_profile_name = "legacy"
     network_ssid = "Unknown"
     
     try:
         if MULTI_NETWORK_SUPPORT:
             # Use multi-network configuration
-            manager = NetworkProfileManager()
+            manager = _manager()
             network_profile_name, network_config = manager.get_network_profile(network_name, auto_detect=True)
             network_ssid = network_config.get("ssid", "Unknown")
             
@@ -135,23 +299,22 @@ def wifi_login(network_name=None):
         print(f"❌ Configuration Error: {e}")
         return
     
-    a_value = str(int(datetime.datetime.now().timestamp()))  # Generate dynamic 'a' value
+    now = datetime.datetime.now()
+    a_value = str(int(now.timestamp()))  # Generate dynamic 'a' value
 
-    payload = {
-        "mode": "191",
-        "username": USERNAME,
-        "password": PASSWORD,
-        "a": a_value,
-        "producttype": PRODUCT_TYPE
-    }
+    payload = _PAYLOAD_TEMPLATE.copy()
+    payload["username"] = USERNAME
+    payload["password"] = PASSWORD
+    payload["a"] = a_value
+    payload["producttype"] = PRODUCT_TYPE
 
     try:
-        response = requests.post(URL, data=payload)
+        response = _get_session().post(URL, data=payload, timeout=10)
         response_status = response.status_code
-        response_message = extract_message(response.text)
+        response_message = extract_response_message(response)
 
         print(f"\n📌 Login Attempt")
-        print(f"Time: {datetime.datetime.now()}")
+        print(f"Time: {now}")
         print(f"Username: {USERNAME}")
         print(f"Session ID (a): {a_value}")
         print(f"Status: {response_status}")
@@ -160,46 +323,53 @@ def wifi_login(network_name=None):
 
         # Log the attempt in SQLite with network information
         log_attempt(USERNAME, PASSWORD, a_value, response_status, response_message, 
-                   network_profile_name, network_ssid)
+                   network_profile_name, network_ssid, timestamp=now)
 
     except requests.exceptions.RequestException as e:
         print(f"❌ Error: {e}")
         log_attempt(USERNAME, PASSWORD, a_value, "FAILED", str(e), 
-                   network_profile_name, network_ssid)
+                   network_profile_name, network_ssid, timestamp=now)
+    finally:
+        # Make the attempt visible to the dashboard and safe from SIGTERM right away
+        _flush_logs()
 
 # --- VIEW LOGIN LOGS ---
+_VIEW_SQL_ALL = """
+    SELECT timestamp, network_name, network_ssid, username, a, response_status, response_message 
+    FROM login_attempts 
+    ORDER BY timestamp DESC LIMIT ?
+"""
+
+_VIEW_SQL_FILTERED = """
+    SELECT timestamp, network_name, network_ssid, username, a, response_status, response_message 
+    FROM login_attempts 
+    WHERE network_name = ? ORDER BY timestamp DESC LIMIT ?
+"""
+
+# One multi-line message per record, in the column order of the queries above
+_VIEW_RECORD_TEMPLATE = "\n".join((
+    "Time: %s",
+    "Network: %s (%s)",
+    "Username: %s",
+    "Session ID (a): %s",
+    "Status: %s",
+    "Message: %s",
+    "-" * 80,
+))
+
 def view_logs(limit=5, network_filter=None):
     """Display login logs in a readable format."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    # setup_database() guarantees the network columns exist
+    setup_database()
+    _flush_logs()
+    cursor = _get_db().cursor()
     
-    # Check if table has new network columns
-    cursor.execute("PRAGMA table_info(login_attempts)")
-    columns = [row[1] for row in cursor.fetchall()]
-    has_network_columns = 'network_name' in columns and 'network_ssid' in columns
-    
-    if has_network_columns:
-        base_query = """
-            SELECT timestamp, network_name, network_ssid, username, a, response_status, response_message 
-            FROM login_attempts 
-        """
-        if network_filter:
-            query = base_query + "WHERE network_name = ? ORDER BY timestamp DESC LIMIT ?"
-            cursor.execute(query, (network_filter, limit))
-        else:
-            query = base_query + "ORDER BY timestamp DESC LIMIT ?"
-            cursor.execute(query, (limit,))
+    if network_filter:
+        cursor.execute(_VIEW_SQL_FILTERED, (network_filter, limit))
     else:
-        # Legacy table structure
-        cursor.execute("""
-            SELECT timestamp, username, a, response_status, response_message 
-            FROM login_attempts 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        """, (limit,))
+        cursor.execute(_VIEW_SQL_ALL, (limit,))
 
     logs = cursor.fetchall()
-    conn.close()
 
     if not logs:
         filter_msg = f" for network '{network_filter}'" if network_filter else ""
@@ -211,22 +381,7 @@ def view_logs(limit=5, network_filter=None):
     logger.info("=" * 80)
 
     for log in logs:
-        if has_network_columns:
-            timestamp, network_name, network_ssid, username, a, status, message = log
-            logger.info(f"Time: {timestamp}")
-            logger.info(f"Network: {network_name} ({network_ssid})")
-            logger.info(f"Username: {username}")
-            logger.info(f"Session ID (a): {a}")
-            logger.info(f"Status: {status}")
-            logger.info(f"Message: {message}")
-        else:
-            timestamp, username, a, status, message = log
-            logger.info(f"Time: {timestamp}")
-            logger.info(f"Username: {username}")
-            logger.info(f"Session ID (a): {a}")
-            logger.info(f"Status: {status}")
-            logger.info(f"Message: {message}")
-        logger.info("-" * 80)
+        logger.info(_VIEW_RECORD_TEMPLATE, *log)
 
 def parse_arguments():
     """Parse command line arguments for logging configuration."""
@@ -287,18 +442,20 @@ def parse_arguments():
 
 def clear_logs():
     """Deletes all logs from the login_attempts table."""
-    conn = sqlite3.connect(DB_NAME)
+    _pending_logs.clear()
+    conn = _get_db()
     cursor = conn.cursor()
     cursor.execute("DELETE FROM login_attempts")
     conn.commit()
-    conn.close()
     print("✅ All logs have been cleared.")
 
 def test_connection(network_name=None):
     """Tests if the login URL is reachable."""
+    import requests
+    
     try:
         if MULTI_NETWORK_SUPPORT:
-            manager = NetworkProfileManager()
+            manager = _manager()
             network_profile_name, network_config = manager.get_network_profile(network_name, auto_detect=True)
             url = network_config["wifi_url"]
             print(f"🔗 Testing connection for network '{network_profile_name}' to {url}...")
@@ -307,7 +464,12 @@ def test_connection(network_name=None):
             url = config["wifi_url"]
             print(f"🔗 Testing connection to {url}...")
         
-        response = requests.head(url, timeout=5) # Use HEAD to be efficient
+        session = _get_session()
+        response = session.head(url, timeout=5, allow_redirects=False) # Use HEAD to be efficient
+        if response.status_code == 405:
+            # Portal rejects HEAD; fall back to GET but only read the status line, never the body
+            response = session.get(url, timeout=5, stream=True, allow_redirects=False)
+            response.close()
         if response.status_code == 200:
             print(f"✅ Connection successful! The server responded with status {response.status_code}.")
         else:
@@ -426,9 +588,14 @@ def setup_multi_network():
 
 def save_config(config):
     """Save configuration to config.json file."""
+    global _CFG_CACHE
     try:
         with open(CONFIG_PATH, 'w') as f:
             json.dump(config, f, indent=2)
+        _CFG_CACHE = None
+        if MULTI_NETWORK_SUPPORT:
+            # Don't trust the mtime check to notice a rewrite within the same timestamp tick
+            invalidate_config_cache(CONFIG_PATH)
         print(f"\n💾 Configuration saved to {CONFIG_PATH}")
     except Exception as e:
         print(f"\n❌ Error saving configuration: {e}")
@@ -440,7 +607,7 @@ def list_networks():
         return
     
     try:
-        manager = NetworkProfileManager()
+        manager = _manager()
         networks = manager.list_networks()
         current_ssid = get_current_ssid()
         
@@ -484,7 +651,7 @@ def detect_network():
         
         print(f"📡 Current SSID: {current_ssid}")
         
-        manager = NetworkProfileManager()
+        manager = _manager()
         try:
             network_name, network_config = manager.get_network_profile(auto_detect=True)
             print(f"✅ Found matching profile: {network_name}")